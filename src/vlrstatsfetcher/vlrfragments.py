@@ -0,0 +1,273 @@
+import os
+import html
+import json
+import zlib
+import shutil
+import hashlib
+import logging
+from collections import Counter
+import pandas as pd
+from bs4 import BeautifulSoup
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+INDEX_FILE: str = "index.csv"
+META_FILE: str = "meta.json"
+DICTIONARIES_DIR: str = "dictionaries"
+OBJECTS_DIR: str = "objects"
+# Objects compressed without a dictionary live under objects/plain
+PLAIN_OBJECTS: str = "plain"
+INDEX_COLUMNS = ['match_id', 'data_url', 'header_hash', 'game_hashes']
+# zlib only looks back 32KB so a longer preset dictionary is wasted
+ZLIB_DICTIONARY_SIZE: int = 32768
+ZSTD_DICTIONARY_SIZE: int = 112640
+# zstd cannot train on a handful of samples, below this the archive stays without a dictionary
+MIN_DICTIONARY_SAMPLES: int = 16
+
+
+def get_match_fragments(match_soup: BeautifulSoup) -> tuple:
+    """Cuts a match page down to the parts the scraper reads
+
+    Returns:
+        tuple: (data_url, header, games). data_url is the vm-stats data-url holding the match id,
+        header is the match date and match-header-vs html, games is a list of html strings, one per
+        vm-stats-game map. The 'all' game is dropped since get_game_soups never reads it.
+    """
+    date = match_soup.find(class_="moment-tz-convert")
+    header_vs = match_soup.find(class_="match-header-vs")
+    vm_stats = match_soup.find(class_="vm-stats")
+    stats_container = match_soup.find(class_="vm-stats-container")
+    if header_vs is None or vm_stats is None or stats_container is None:
+        raise ValueError("match soup is missing match-header-vs or vm-stats-container")
+    header = f'<div class="match-header">{date if date is not None else ""}{header_vs}</div>'
+    games = [str(game) for game in stats_container.find_all(class_="vm-stats-game") if game.get('data-game-id') != 'all']
+    return vm_stats.get('data-url', ''), header, games
+
+
+def content_hash(fragment: bytes) -> str:
+    """Returns the sha256 hex digest used as a fragment's address"""
+    return hashlib.sha256(fragment).hexdigest()
+
+
+def write_atomic(path: str, content: bytes) -> None:
+    """Writes to a temporary file next to path and renames it into place"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', mode='wb') as file:
+        file.write(content)
+    os.replace(path + '.tmp', path)
+
+
+def train_zlib_dictionary(samples: list, size: int = ZLIB_DICTIONARY_SIZE) -> bytes:
+    """Builds a zlib preset dictionary out of the tags and text that repeat most across samples
+
+    The most common chunks are placed last since zlib finds nearby matches cheapest
+    """
+    counts = Counter()
+    for sample in samples:
+        chunks = (b'<' + chunk.strip() for chunk in sample.split(b'<'))
+        counts.update(set(chunk for chunk in chunks if len(chunk) > 3))
+    dictionary = b''
+    for chunk, count in counts.most_common():
+        if count < 2:
+            break
+        if len(dictionary) + len(chunk) > size:
+            continue
+        dictionary = chunk + dictionary
+    return dictionary
+
+
+class FragmentStore:
+    """Content addressed archive of map level match fragments, compressed with a shared dictionary
+
+    Each match keeps its header fragment and one fragment per map (see get_match_fragments). Fragments are
+    stored once per sha256 and the index maps match ids to fragment hashes. Objects are kept in a directory
+    per dictionary and meta.json names the dictionary in use, so retraining never mixes dictionaries.
+
+    Args:
+        path (str): Directory of the archive, created if missing.\n
+        codec (str, optional): 'zstd' or 'zlib' for a new archive, must match an existing archive's codec if given.
+            Defaults to zstd when zstandard is installed.
+    """
+
+    def __init__(self, path: str, codec: str = None) -> None:
+        self.path = path
+        meta_file = os.path.join(path, META_FILE)
+        if os.path.isfile(meta_file):
+            with open(meta_file) as file:
+                meta = json.load(file)
+            if codec is not None and codec != meta['codec']:
+                raise ValueError(f"Fragment archive {path} uses {meta['codec']}, not {codec}")
+            self.codec = meta['codec']
+            self.dictionary_id = meta.get('dictionary')
+        else:
+            self.codec = codec or ('zstd' if zstandard is not None else 'zlib')
+            self.dictionary_id = None
+        if self.codec == 'zstd' and zstandard is None:
+            raise ImportError("zstandard is required to open a zstd fragment archive")
+        if self.codec not in ('zstd', 'zlib'):
+            raise ValueError(f"Unknown fragment codec: {self.codec}")
+        if not os.path.isfile(meta_file):
+            self._write_meta()
+        self.dictionary = None
+        if self.dictionary_id:
+            with open(self._dictionary_path(self.dictionary_id), mode='rb') as file:
+                self.dictionary = file.read()
+        try:
+            index = pd.read_csv(os.path.join(path, INDEX_FILE), dtype=str, keep_default_na=False)
+            self.index = {row.match_id: (row.data_url, row.header_hash, row.game_hashes.split())
+                          for row in index.itertuples()}
+        except FileNotFoundError:
+            self.index = {}
+        self._set_codec_contexts()
+
+    def _write_meta(self) -> None:
+        meta = json.dumps({'codec': self.codec, 'dictionary': self.dictionary_id})
+        write_atomic(os.path.join(self.path, META_FILE), meta.encode('utf-8'))
+
+    def _dictionary_path(self, dictionary_id: str) -> str:
+        return os.path.join(self.path, DICTIONARIES_DIR, dictionary_id)
+
+    def _objects_dir(self, dictionary_id: str = None) -> str:
+        return os.path.join(self.path, OBJECTS_DIR, dictionary_id or PLAIN_OBJECTS)
+
+    def _object_path(self, fragment_hash: str) -> str:
+        return os.path.join(self._objects_dir(self.dictionary_id), fragment_hash[:2], fragment_hash)
+
+    def _set_codec_contexts(self) -> None:
+        if self.codec == 'zstd':
+            zstd_dict = zstandard.ZstdCompressionDict(self.dictionary) if self.dictionary else None
+            self._compressor = zstandard.ZstdCompressor(level=19, dict_data=zstd_dict)
+            self._decompressor = zstandard.ZstdDecompressor(dict_data=zstd_dict)
+
+    def compress(self, fragment: bytes) -> bytes:
+        if self.codec == 'zstd':
+            return self._compressor.compress(fragment)
+        if self.dictionary:
+            compressor = zlib.compressobj(level=9, zdict=self.dictionary)
+        else:
+            compressor = zlib.compressobj(level=9)
+        return compressor.compress(fragment) + compressor.flush()
+
+    def decompress(self, blob: bytes) -> bytes:
+        if self.codec == 'zstd':
+            return self._decompressor.decompress(blob)
+        if self.dictionary:
+            decompressor = zlib.decompressobj(zdict=self.dictionary)
+        else:
+            decompressor = zlib.decompressobj()
+        return decompressor.decompress(blob) + decompressor.flush()
+
+    def _object_hashes(self) -> set:
+        return {fragment_hash for _, header_hash, game_hashes in self.index.values()
+                for fragment_hash in [header_hash, *game_hashes]}
+
+    def put_fragment(self, fragment: bytes) -> str:
+        """Stores a fragment if its content is not already archived, returns its hash"""
+        fragment_hash = content_hash(fragment)
+        object_path = self._object_path(fragment_hash)
+        if not os.path.isfile(object_path):
+            write_atomic(object_path, self.compress(fragment))
+        return fragment_hash
+
+    def get_fragment(self, fragment_hash: str) -> bytes:
+        with open(self._object_path(fragment_hash), mode='rb') as file:
+            return self.decompress(file.read())
+
+    def put(self, match_id: int, match_soup: BeautifulSoup) -> None:
+        """Archives the header and map fragments of a match soup, raises ValueError if it is not a match page"""
+        data_url, header, games = get_match_fragments(match_soup)
+        self.index[str(match_id)] = (data_url, self.put_fragment(header.encode('utf-8')),
+                                     [self.put_fragment(game.encode('utf-8')) for game in games])
+
+    def get(self, match_id: int) -> BeautifulSoup:
+        """Returns a soup made of the archived fragments of a match, None if it is not archived"""
+        entry = self.index.get(str(match_id))
+        if entry is None:
+            return None
+        data_url, header_hash, game_hashes = entry
+        games = b''.join(self.get_fragment(fragment_hash) for fragment_hash in game_hashes)
+        page = (self.get_fragment(header_hash)
+                + f'<div class="vm-stats" data-url="{html.escape(data_url)}"><div class="vm-stats-container">'.encode('utf-8')
+                + games + b'</div></div>')
+        return BeautifulSoup(page, 'lxml')
+
+    def __contains__(self, match_id) -> bool:
+        return str(match_id) in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def match_ids(self) -> list:
+        return list(self.index.keys())
+
+    def train_dictionary(self, size: int = None) -> bool:
+        """Trains a shared dictionary on the archived fragments and recompresses every object with it
+
+        The recompressed objects go to a new directory and meta.json is switched over last, so an interrupted
+        retrain leaves the archive on its previous dictionary.
+
+        Returns:
+            bool: False if there were too few fragments to train on and the archive was left as it was
+        """
+        fragments = {fragment_hash: self.get_fragment(fragment_hash) for fragment_hash in self._object_hashes()}
+        samples = list(fragments.values())
+        if len(samples) < MIN_DICTIONARY_SAMPLES:
+            print(f"Only {len(samples)} fragments archived, not training a dictionary")
+            return False
+        if self.codec == 'zstd':
+            try:
+                dictionary = zstandard.train_dictionary(size or ZSTD_DICTIONARY_SIZE, samples).as_bytes()
+            except zstandard.ZstdError as error:
+                print(f"Could not train a zstd dictionary, keeping the current one: {error}")
+                return False
+        else:
+            dictionary = train_zlib_dictionary(samples, size or ZLIB_DICTIONARY_SIZE)
+        dictionary_id = content_hash(dictionary)[:16]
+        if dictionary_id == self.dictionary_id:
+            return True
+        old_dictionary, old_dictionary_id = self.dictionary, self.dictionary_id
+        try:
+            write_atomic(self._dictionary_path(dictionary_id), dictionary)
+            self.dictionary, self.dictionary_id = dictionary, dictionary_id
+            self._set_codec_contexts()
+            for fragment_hash, fragment in fragments.items():
+                write_atomic(self._object_path(fragment_hash), self.compress(fragment))
+            self._write_meta()
+        except BaseException:
+            # meta.json still names the old dictionary, so everything written for the new one is unreachable
+            self.dictionary, self.dictionary_id = old_dictionary, old_dictionary_id
+            self._set_codec_contexts()
+            shutil.rmtree(self._objects_dir(dictionary_id), ignore_errors=True)
+            if os.path.isfile(self._dictionary_path(dictionary_id)):
+                os.remove(self._dictionary_path(dictionary_id))
+            raise
+        shutil.rmtree(self._objects_dir(old_dictionary_id), ignore_errors=True)
+        if old_dictionary_id:
+            os.remove(self._dictionary_path(old_dictionary_id))
+        logging.debug(f"trained {len(dictionary)} byte {self.codec} dictionary on {len(samples)} fragments")
+        return True
+
+    def save(self) -> None:
+        """Writes the match index, objects are written as they are added"""
+        index = pd.DataFrame([[match_id, data_url, header_hash, ' '.join(game_hashes)]
+                              for match_id, (data_url, header_hash, game_hashes) in self.index.items()],
+                             columns=INDEX_COLUMNS)
+        write_atomic(os.path.join(self.path, INDEX_FILE), index.to_csv(index=False).encode('utf-8'))
+
+
+def archive_soups_file(soups_file: str, archive_dir: str, codec: str = None) -> FragmentStore:
+    """Converts a stored soups csv (match_id, soup) into a fragment archive, training a dictionary if there is enough data"""
+    store = FragmentStore(archive_dir, codec=codec)
+    stored_soups = pd.read_csv(soups_file)
+    for match_id, soup in zip(stored_soups['match_id'], stored_soups['soup']):
+        try:
+            store.put(match_id, BeautifulSoup(soup, 'lxml'))
+        except ValueError:
+            print(f"Skipping match {match_id}, no match stats in stored soup")
+    store.save()
+    store.train_dictionary()
+    return store
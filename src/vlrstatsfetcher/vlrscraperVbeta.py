@@ -6,6 +6,7 @@ import requests
 import requests.api
 import pandas as pd
 from bs4 import BeautifulSoup
+from vlrstatsfetcher.vlrfragments import FragmentStore
 
 
 logging.basicConfig(level=logging.DEBUG)
@@ -67,6 +68,12 @@ class RequestString(str):
         return self.string
 
 
+def set_base_url(base_url: str = "https://www.vlr.gg/") -> None:
+    """Points get_soup at another host with the vlr.gg url layout (i.e. a local stand-in server)"""
+    global BASE
+    BASE = base_url if base_url.endswith('/') else base_url + '/'
+
+
 def get_soup(address: str) -> BeautifulSoup:
     """Allows bs4 to parse the required address"""
     request_link: str = BASE + address
@@ -271,6 +278,45 @@ def get_match_datas(match_ids: list, data_file: str = '', soups_file: str = ''):
     return data, stored_soups
 
 
+def get_match_datas_from_fragments(match_ids: list, fragments_dir: str) -> list:
+    """Returns match data for the given matches, reading soups from a fragment archive
+
+    Matches missing from the archive are fetched and archived. Matches that do not come back as a match page
+    (404, 429, 5xx) are skipped, and the archive index is saved even if the loop is interrupted. An archive
+    without a dictionary gets one trained once it holds enough fragments.
+
+    Args:
+        match_ids (list): Match ids to collect player data for.\n
+        fragments_dir (str): Directory of the FragmentStore, created if missing.
+
+    Returns:
+        list: A list of player objects for every match that could be loaded
+    """
+    data = []
+    store = FragmentStore(fragments_dir)
+    print(f"Loaded fragment archive: {fragments_dir} ({len(store)} matches)")
+    try:
+        for i, match_id in enumerate(match_ids):
+            print(f"Match {i + 1} / {len(match_ids)}")
+            match_soup = store.get(match_id)
+            if match_soup is None:
+                match_soup = get_soup(str(match_id))
+                if match_soup is None:
+                    print(f"Skipping match {match_id}, page not found")
+                    continue
+                try:
+                    store.put(match_id, match_soup)
+                except ValueError:
+                    print(f"Skipping match {match_id}, response was not a match page")
+                    continue
+            data += get_match_data(match_soup=match_soup)
+    finally:
+        store.save()
+        if store.dictionary_id is None:
+            store.train_dictionary()
+    return data
+
+
 def get_match_date(match_id: int = None, match_soup: BeautifulSoup = None) -> str:
     """Returns the date of the match"""
     if not match_soup:
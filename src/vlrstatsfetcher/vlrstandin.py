@@ -0,0 +1,281 @@
+import os
+import re
+import time
+import random
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlsplit, parse_qs
+
+
+# Mirrors the vlr.gg paths requested through get_soup:
+#   BASE + match_id
+#   BASE + PLAYER + MATCHES + player_id + '/?page=N'
+#   BASE + TEAM + MATCHES + team_id + '/?page=N'
+MATCH_PATH = re.compile(r'^/(?P<match_id>\d+)(/[^/]*)?/?$')
+MATCH_LIST_PATH = re.compile(r'^/(?:player|team)/matches/(?P<owner_id>\d+)/?$')
+
+MATCHES_PER_PAGE: int = 50
+REQUEST_QUEUE_SIZE: int = 128
+MAPS = ['Ascent', 'Bind', 'Haven', 'Split', 'Lotus', 'Pearl', 'Fracture', 'Icebox', 'Breeze']
+AGENTS = ['Jett', 'Raze', 'Omen', 'Sova', 'Killjoy', 'Viper', 'Skye', 'Fade', 'Brimstone', 'Cypher']
+
+
+class StandInConfig:
+    """Behaviour of the stand-in server, shared by every request handler thread
+
+    Args:
+        pages_dir (str, optional): Directory of recorded pages, laid out like the site paths. Defaults to None.\n
+        synthetic (bool, optional): Generate a page when no recording exists. Defaults to True.\n
+        latency (float, optional): Seconds added to every response. Defaults to 0.\n
+        jitter (float, optional): Extra random seconds added on top of latency. Defaults to 0.\n
+        error_rate (float, optional): Fraction of requests answered with a 5xx. Defaults to 0.\n
+        rate_limit_rate (float, optional): Fraction of requests answered with a 429. Defaults to 0.\n
+        max_rps (float, optional): Requests per second allowed before answering 429. Defaults to 0 (unlimited).\n
+        seed (int, optional): Seed for error injection and jitter. Defaults to None.
+
+    requests_served counts every request received, throttled or not, for throughput tests to read.
+    """
+
+    def __init__(self, pages_dir: str = None, synthetic: bool = True, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, max_rps: float = 0.0, seed: int = None) -> None:
+        self.pages_dir = pages_dir
+        self.synthetic = synthetic
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.max_rps = max_rps
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.requests_served = 0
+
+    def roll(self) -> float:
+        """Returns a random float in [0, 1) from the seeded generator"""
+        with self.lock:
+            return self.random.random()
+
+    def choice(self, options: list):
+        """Returns a random element of options from the seeded generator"""
+        with self.lock:
+            return self.random.choice(options)
+
+    def throttled(self) -> bool:
+        """Counts the request against the current one second window, True if it is over max_rps"""
+        with self.lock:
+            self.requests_served += 1
+            if not self.max_rps:
+                return False
+            now = time.monotonic()
+            if now - self.window_start >= 1:
+                self.window_start = now
+                self.window_count = 0
+            self.window_count += 1
+            return self.window_count > self.max_rps
+
+
+def recorded_page_path(pages_dir: str, path: str, page: int = None) -> str:
+    """Returns where a recorded page for a url path lives
+
+    '/184805' -> pages_dir/184805.html, '/player/matches/864/?page=2' -> pages_dir/player/matches/864.page2.html
+    """
+    parts = [part for part in path.split('/') if part]
+    filename = os.path.join(pages_dir, *parts)
+    if page is not None:
+        filename += f'.page{page}'
+    return filename + '.html'
+
+
+def synthetic_match_page(match_id: int) -> str:
+    """Builds a match page with the markup get_match_data reads, seeded by the match id"""
+    rng = random.Random(match_id)
+    team_ids = rng.sample(range(1, 10000), 2)
+    team_elos = [rng.randint(1000, 2000), rng.randint(1000, 2000)]
+    maps_won = [0, 0]
+    games = []
+    for game_index, map_name in enumerate(rng.sample(MAPS, 3)):
+        if 2 in maps_won:
+            break
+        winner = rng.randint(0, 1)
+        maps_won[winner] += 1
+        scores = [13, rng.randint(0, 11)] if winner == 0 else [rng.randint(0, 11), 13]
+        games.append(synthetic_game(rng, match_id * 10 + game_index, map_name, scores, team_ids))
+    header = ''.join(
+        f'<a class="match-header-link wf-link-hover mod-{i + 1}" href="/team/{team_ids[i]}/team-{team_ids[i]}">'
+        f'<div class="wf-title-med">\n\tTeam {team_ids[i]}\n</div>'
+        f'<div class="match-header-link-name-elo">[{team_elos[i]}]</div></a>'
+        for i in range(2))
+    return (
+        f'<html><body>'
+        f'<div class="match-header-date"><div class="moment-tz-convert" data-utc-ts="2023-04-24 18:00:00"></div></div>'
+        f'<div class="match-header-vs">{header}'
+        f'<div class="match-header-vs-score"><div class="js-spoiler">{maps_won[0]}:{maps_won[1]}</div></div></div>'
+        f'<div class="vm-stats" data-url="/{match_id}/team-{team_ids[0]}-vs-team-{team_ids[1]}">'
+        f'<div class="vm-stats-container"><div class="vm-stats-game" data-game-id="all"></div>{"".join(games)}</div>'
+        f'</div></body></html>'
+    )
+
+
+def synthetic_game(rng: random.Random, game_id: int, map_name: str, scores: list, team_ids: list) -> str:
+    """Builds one vm-stats-game block with ten players"""
+    rows = []
+    for index in range(10):
+        player_id = team_ids[index // 5] * 10 + index % 5
+        kills, deaths, assists = rng.randint(5, 30), rng.randint(5, 25), rng.randint(0, 15)
+        first_kills, first_deaths = rng.randint(0, 6), rng.randint(0, 6)
+        stats = [f'{rng.uniform(0.5, 1.6):.2f}', str(rng.randint(120, 320)), str(kills), f'/{deaths}/', str(assists),
+                 f'{kills - deaths:+d}', f'{rng.randint(50, 90)}%', str(rng.randint(90, 200)), f'{rng.randint(10, 40)}%',
+                 str(first_kills), str(first_deaths), f'{first_kills - first_deaths:+d}']
+        rows.append(
+            f'<tr><td><a href="/player/{player_id}/player-{player_id}">\n'
+            f'<div class="text-of">player{player_id}</div>\n<div class="ge-text-light">T{team_ids[index // 5]}</div>\n</a></td>'
+            f'<td><img title="{AGENTS[index]}"></td>'
+            + ''.join(f'<td class="mod-stat">{stat}</td>' for stat in stats) + '</tr>')
+    return (
+        f'<div class="vm-stats-game" data-game-id="{game_id}">'
+        f'<div class="score">{scores[0]}</div><div class="map"><span style="position: relative;">\n\t{map_name}\n\tPICK</span></div>'
+        f'<div class="score">{scores[1]}</div>'
+        f'<table>{"".join(rows)}</table></div>'
+    )
+
+
+def synthetic_match_list_page(owner_id: int, page: int, first_match_id: int = 100000) -> str:
+    """Builds one page of a player or team match history, MATCHES_PER_PAGE matches long"""
+    start = first_match_id + owner_id * 1000 + (page - 1) * MATCHES_PER_PAGE
+    items = ''.join(f'<a class="wf-card fc-flex m-item" href="/{match_id}/match-{match_id}"></a>'
+                    for match_id in range(start, start + MATCHES_PER_PAGE))
+    return f'<html><body>{items}</body></html>'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers GET requests using the StandInConfig attached to the server"""
+    # Keep-alive, so a load test measures the stand-in rather than a new connection per request
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:
+        config: StandInConfig = self.server.config
+        throttled = config.throttled()
+        delay = config.latency + (config.roll() * config.jitter if config.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        if throttled or (config.rate_limit_rate and config.roll() < config.rate_limit_rate):
+            self.send_html(429, '<html><body>Too Many Requests</body></html>', {'Retry-After': '1'})
+            return
+        if config.error_rate and config.roll() < config.error_rate:
+            self.send_html(config.choice([500, 502, 503]), '<html><body>Server Error</body></html>')
+            return
+        body = self.find_page(config)
+        if body is None:
+            self.send_html(404, '<html><body>Page Not Found</body></html>')
+        else:
+            self.send_html(200, body)
+
+    def find_page(self, config: StandInConfig) -> str:
+        """Returns the recorded page for the path if there is one, otherwise a synthetic page or None"""
+        url = urlsplit(self.path)
+        match = MATCH_PATH.match(url.path)
+        list_match = MATCH_LIST_PATH.match(url.path)
+        if not match and not list_match:
+            return None
+        page = None
+        if list_match:
+            try:
+                page = max(int(parse_qs(url.query).get('page', ['1'])[0]), 1)
+            except ValueError:
+                page = 1
+        if config.pages_dir:
+            path = url.path if list_match else '/' + match.group('match_id')
+            filename = recorded_page_path(config.pages_dir, path, page)
+            if os.path.isfile(filename):
+                with open(filename, encoding='utf-8') as file:
+                    return file.read()
+        if not config.synthetic:
+            return None
+        if match:
+            return synthetic_match_page(int(match.group('match_id')))
+        return synthetic_match_list_page(int(list_match.group('owner_id')), page)
+
+    def send_html(self, status: int, body: str, headers: dict = None) -> None:
+        content = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format: str, *args) -> None:
+        logging.debug(f"stand-in {self.address_string()} - {format % args}")
+
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+    """Threaded HTTP server that copies the vlr.gg url layout for load testing
+
+    Point the scraper at it with vlrscraperVbeta.set_base_url(server.base_url)
+
+    Args:
+        host (str, optional): Address to bind. Defaults to '127.0.0.1'.\n
+        port (int, optional): Port to bind, 0 picks a free one. Defaults to 0.\n
+        config (StandInConfig, optional): Server behaviour. Defaults to StandInConfig().\n
+        request_queue_size (int, optional): Listen backlog for pending connections. Defaults to REQUEST_QUEUE_SIZE.
+    """
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, config: StandInConfig = None,
+                 request_queue_size: int = None) -> None:
+        # Read by server_activate inside HTTPServer.__init__, so it has to be set first
+        self.request_queue_size = request_queue_size or REQUEST_QUEUE_SIZE
+        super().__init__((host, port), StandInHandler)
+        self.config = config if config is not None else StandInConfig()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> threading.Thread:
+        """Serves from a background thread, returns the thread"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description='Local stand-in for vlr.gg match, player and team match pages')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--pages-dir', default=None, help='directory of recorded pages')
+    parser.add_argument('--no-synthetic', action='store_true', help='404 when no recorded page exists')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random seconds on top of latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of responses that are 5xx')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='fraction of responses that are 429')
+    parser.add_argument('--max-rps', type=float, default=0.0, help='requests per second before answering 429')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--request-queue-size', type=int, default=REQUEST_QUEUE_SIZE, help='listen backlog for pending connections')
+    args = parser.parse_args(argv)
+    config = StandInConfig(pages_dir=args.pages_dir, synthetic=not args.no_synthetic, latency=args.latency,
+                           jitter=args.jitter, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                           max_rps=args.max_rps, seed=args.seed)
+    server = StandInServer(args.host, args.port, config, request_queue_size=args.request_queue_size)
+    print(f"Serving vlr stand-in at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {config.requests_served} requests")
+
+
+if __name__ == '__main__':
+    main()
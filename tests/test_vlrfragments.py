@@ -0,0 +1,194 @@
+import json
+import importlib.util
+import pytest
+import pandas as pd
+from bs4 import BeautifulSoup
+import vlrstatsfetcher.vlrscraperVbeta as vlrs
+import vlrstatsfetcher.vlrfragments as vlrfragments
+from vlrstatsfetcher.vlrfragments import FragmentStore, archive_soups_file, get_match_fragments, META_FILE
+from vlrstatsfetcher.vlrstandin import StandInConfig, StandInServer, synthetic_match_page
+
+MATCH_IDS = list(range(184800, 184812))
+CODECS = ['zlib', pytest.param('zstd', marks=pytest.mark.skipif(
+    importlib.util.find_spec('zstandard') is None, reason='zstandard is not installed'))]
+
+
+def match_soup(match_id: int) -> BeautifulSoup:
+    return BeautifulSoup(synthetic_match_page(match_id), 'lxml')
+
+
+def fill_store(store: FragmentStore, match_ids: list = MATCH_IDS) -> None:
+    for match_id in match_ids:
+        store.put(match_id, match_soup(match_id))
+
+
+def assert_round_trip(store: FragmentStore, match_ids: list = MATCH_IDS) -> None:
+    for match_id in match_ids:
+        assert vlrs.get_match_data(match_soup=store.get(match_id)) == vlrs.get_match_data(match_soup=match_soup(match_id))
+
+
+def test_fragments_are_map_level():
+    data_url, header, games = get_match_fragments(match_soup(184805))
+    assert data_url.startswith('/184805/')
+    assert 'match-header-vs' in header and 'moment-tz-convert' in header
+    assert len(games) in (2, 3)
+    assert all(game.count('vm-stats-game') == 1 and 'data-game-id="all"' not in game for game in games)
+
+
+def test_get_match_fragments_rejects_other_pages():
+    with pytest.raises(ValueError):
+        get_match_fragments(BeautifulSoup('<html><body>Too Many Requests</body></html>', 'lxml'))
+
+
+@pytest.mark.parametrize('codec', CODECS)
+def test_round_trip(tmp_path, codec):
+    store = FragmentStore(str(tmp_path), codec=codec)
+    fill_store(store)
+    assert len(store) == len(MATCH_IDS)
+    assert 184805 in store and '184805' in store and 1 not in store
+    assert store.get(1) is None
+    assert_round_trip(store)
+
+
+@pytest.mark.parametrize('codec', CODECS)
+def test_reopen_after_save(tmp_path, codec):
+    store = FragmentStore(str(tmp_path), codec=codec)
+    fill_store(store)
+    store.save()
+    reopened = FragmentStore(str(tmp_path))
+    assert reopened.codec == codec
+    assert sorted(reopened.match_ids()) == sorted(str(match_id) for match_id in MATCH_IDS)
+    assert_round_trip(reopened)
+
+
+def test_codec_must_match_existing_archive(tmp_path):
+    FragmentStore(str(tmp_path), codec='zlib')
+    assert FragmentStore(str(tmp_path)).codec == 'zlib'
+    assert FragmentStore(str(tmp_path), codec='zlib').codec == 'zlib'
+    with pytest.raises(ValueError):
+        FragmentStore(str(tmp_path), codec='zstd')
+
+
+def test_identical_fragments_are_stored_once(tmp_path):
+    store = FragmentStore(str(tmp_path), codec='zlib')
+    fill_store(store, [184805])
+    objects = sorted(path.name for path in (tmp_path / 'objects').rglob('*') if path.is_file())
+    store.put(184806, match_soup(184805))
+    assert sorted(path.name for path in (tmp_path / 'objects').rglob('*') if path.is_file()) == objects
+    assert store.index['184806'] == store.index['184805']
+
+
+@pytest.mark.parametrize('codec', CODECS)
+def test_retrain_dictionary(tmp_path, codec):
+    store = FragmentStore(str(tmp_path), codec=codec)
+    fill_store(store, MATCH_IDS[:8])
+    store.save()
+    assert store.train_dictionary()
+    first_dictionary = store.dictionary_id
+    fill_store(store, MATCH_IDS[8:])
+    store.save()
+    assert store.train_dictionary(size=4096)
+    assert store.dictionary_id != first_dictionary
+    assert not (tmp_path / 'objects' / first_dictionary).exists()
+    assert not (tmp_path / 'objects' / 'plain').exists()
+    with open(tmp_path / META_FILE) as file:
+        assert json.load(file)['dictionary'] == store.dictionary_id
+    assert_round_trip(store)
+    assert_round_trip(FragmentStore(str(tmp_path)))
+
+
+@pytest.mark.parametrize('codec', CODECS)
+@pytest.mark.parametrize('matches', [1, 3])
+def test_archive_small_soups_file(tmp_path, codec, matches):
+    soups_file = str(tmp_path / 'soups.csv')
+    pd.DataFrame([[match_id, synthetic_match_page(match_id)] for match_id in MATCH_IDS[:matches]],
+                 columns=['match_id', 'soup']).to_csv(soups_file, index=False)
+    store = archive_soups_file(soups_file, str(tmp_path / 'archive'), codec=codec)
+    assert store.dictionary_id is None
+    reopened = FragmentStore(str(tmp_path / 'archive'))
+    assert len(reopened) == matches
+    assert_round_trip(reopened, MATCH_IDS[:matches])
+
+
+@pytest.mark.parametrize('codec', CODECS)
+def test_archive_soups_file_trains_dictionary(tmp_path, codec):
+    soups_file = str(tmp_path / 'soups.csv')
+    pd.DataFrame([[match_id, synthetic_match_page(match_id)] for match_id in MATCH_IDS],
+                 columns=['match_id', 'soup']).to_csv(soups_file, index=False)
+    store = archive_soups_file(soups_file, str(tmp_path / 'archive'), codec=codec)
+    assert store.dictionary_id is not None
+    assert_round_trip(FragmentStore(str(tmp_path / 'archive')))
+
+
+def test_fetching_skips_error_pages_and_saves_index(tmp_path):
+    server = StandInServer(config=StandInConfig(error_rate=0.5, seed=3))
+    server.start()
+    original = vlrs.BASE
+    vlrs.set_base_url(server.base_url)
+    try:
+        data = vlrs.get_match_datas_from_fragments(MATCH_IDS, str(tmp_path))
+    finally:
+        vlrs.set_base_url(original)
+        server.stop()
+    store = FragmentStore(str(tmp_path))
+    assert 0 < len(store) < len(MATCH_IDS)
+    assert {player.match_id for player in data} == {int(match_id) for match_id in store.match_ids()}
+
+
+@pytest.mark.skipif(importlib.util.find_spec('zstandard') is None, reason='zstandard is not installed')
+def test_zstd_training_error_keeps_archive(tmp_path, monkeypatch):
+    import zstandard
+    store = FragmentStore(str(tmp_path), codec='zstd')
+    fill_store(store)
+    store.save()
+
+    def fail(*args, **kwargs):
+        raise zstandard.ZstdError('cannot train dict: Src size is incorrect')
+    monkeypatch.setattr(zstandard, 'train_dictionary', fail)
+    assert not store.train_dictionary()
+    assert store.dictionary_id is None
+    assert_round_trip(FragmentStore(str(tmp_path)))
+
+
+def test_interrupted_retrain_keeps_previous_dictionary(tmp_path, monkeypatch):
+    store = FragmentStore(str(tmp_path), codec='zlib')
+    fill_store(store)
+    store.save()
+    assert store.train_dictionary()
+    first_dictionary = store.dictionary_id
+    writes = []
+
+    def write_then_fail(path, content):
+        writes.append(path)
+        if len(writes) > 3:
+            raise KeyboardInterrupt
+        original_write_atomic(path, content)
+    original_write_atomic = vlrfragments.write_atomic
+    monkeypatch.setattr(vlrfragments, 'write_atomic', write_then_fail)
+    with pytest.raises(KeyboardInterrupt):
+        store.train_dictionary(size=4096)
+    monkeypatch.undo()
+    assert store.dictionary_id == first_dictionary
+    assert [path.name for path in (tmp_path / 'objects').iterdir()] == [first_dictionary]
+    assert [path.name for path in (tmp_path / 'dictionaries').iterdir()] == [first_dictionary]
+    reopened = FragmentStore(str(tmp_path))
+    assert reopened.dictionary_id == first_dictionary
+    assert_round_trip(reopened)
+
+
+def test_fetching_trains_dictionary(tmp_path):
+    server = StandInServer()
+    server.start()
+    original = vlrs.BASE
+    vlrs.set_base_url(server.base_url)
+    try:
+        vlrs.get_match_datas_from_fragments(MATCH_IDS[:2], str(tmp_path))
+        assert FragmentStore(str(tmp_path)).dictionary_id is None
+        vlrs.get_match_datas_from_fragments(MATCH_IDS, str(tmp_path))
+    finally:
+        vlrs.set_base_url(original)
+        server.stop()
+    store = FragmentStore(str(tmp_path))
+    assert store.dictionary_id is not None
+    assert not (tmp_path / 'objects' / 'plain').exists()
+    assert_round_trip(store)
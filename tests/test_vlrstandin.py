@@ -0,0 +1,139 @@
+import re
+import pytest
+import requests
+import vlrstatsfetcher.vlrscraperVbeta as vlrs
+from vlrstatsfetcher.vlrstandin import StandInConfig, StandInHandler, StandInServer, REQUEST_QUEUE_SIZE, MATCHES_PER_PAGE
+from vlrstatsfetcher.vlrstandin import synthetic_match_page
+
+
+@pytest.fixture
+def serve():
+    """Starts stand-in servers for a test and stops them afterwards"""
+    servers = []
+
+    def start(config: StandInConfig = None, **kwargs) -> StandInServer:
+        server = StandInServer(config=config, **kwargs)
+        server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def base_url():
+    """Restores the scraper's base url after a test points it elsewhere"""
+    original = vlrs.BASE
+    yield
+    vlrs.set_base_url(original)
+
+
+@pytest.mark.parametrize("path, status", [
+    ("184805", 200),
+    ("184805/", 200),
+    ("184805/team-a-vs-team-b", 200),
+    ("player/matches/864/?page=2", 200),
+    ("team/matches/5/", 200),
+    ("news/", 404),
+    ("player/864", 404),
+    ("184805/a/b", 404),
+    ("team/matches/abc/", 404),
+])
+def test_routes(serve, path, status):
+    server = serve()
+    assert requests.get(server.base_url + path).status_code == status
+
+
+def test_match_list_pages(serve):
+    server = serve()
+    first = requests.get(server.base_url + "player/matches/864/?page=1").text
+    second = requests.get(server.base_url + "player/matches/864/?page=2").text
+    assert first.count("m-item") == MATCHES_PER_PAGE
+    assert first != second
+    assert requests.get(server.base_url + "player/matches/864/").text == first
+
+
+def test_recorded_pages_take_priority(serve, tmp_path):
+    (tmp_path / "184805.html").write_text("<html>recorded match</html>")
+    (tmp_path / "player" / "matches").mkdir(parents=True)
+    (tmp_path / "player" / "matches" / "864.page2.html").write_text("<html>recorded page 2</html>")
+    server = serve(StandInConfig(pages_dir=str(tmp_path)))
+    assert requests.get(server.base_url + "184805/team-a-vs-team-b").text == "<html>recorded match</html>"
+    assert requests.get(server.base_url + "player/matches/864/?page=2").text == "<html>recorded page 2</html>"
+    assert "m-item" in requests.get(server.base_url + "player/matches/864/?page=1").text
+    assert "vm-stats-container" in requests.get(server.base_url + "184806").text
+
+
+def test_no_synthetic_404s_without_recording(serve, tmp_path):
+    (tmp_path / "184805.html").write_text("<html>recorded match</html>")
+    server = serve(StandInConfig(pages_dir=str(tmp_path), synthetic=False))
+    assert requests.get(server.base_url + "184805").status_code == 200
+    assert requests.get(server.base_url + "184806").status_code == 404
+
+
+def test_rate_limit_injection(serve):
+    server = serve(StandInConfig(rate_limit_rate=1))
+    response = requests.get(server.base_url + "184805")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_error_injection(serve):
+    server = serve(StandInConfig(error_rate=1))
+    assert all(requests.get(server.base_url + "184805").status_code in (500, 502, 503) for _ in range(5))
+
+
+def test_seeded_injection_is_repeatable(serve):
+    statuses = []
+    for _ in range(2):
+        server = serve(StandInConfig(error_rate=0.3, rate_limit_rate=0.3, seed=7))
+        statuses.append([requests.get(server.base_url + "184805").status_code for _ in range(20)])
+    assert statuses[0] == statuses[1]
+    assert {200, 429} <= set(statuses[0])
+    assert set(statuses[0]) & {500, 502, 503}
+
+
+def test_requests_served_counts_every_request(serve):
+    config = StandInConfig(max_rps=1)
+    server = serve(config)
+    for path in ["184805", "184805", "news/"]:
+        requests.get(server.base_url + path)
+    assert config.requests_served == 3
+
+
+def test_synthetic_teams_are_distinct():
+    # 4099 and 5664 drew the same team twice when the ids were picked independently
+    for match_id in range(4000, 6000):
+        team_ids = re.search(r'data-url="/\d+/team-(\d+)-vs-team-(\d+)"', synthetic_match_page(match_id)).groups()
+        assert team_ids[0] != team_ids[1]
+
+
+def test_max_rps_throttle(serve):
+    server = serve(StandInConfig(max_rps=2))
+    statuses = [requests.get(server.base_url + "184805").status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+
+
+def test_server_connection_settings(serve):
+    assert serve().request_queue_size == REQUEST_QUEUE_SIZE
+    assert serve(request_queue_size=16).request_queue_size == 16
+    assert StandInHandler.protocol_version == 'HTTP/1.1'
+    server = serve()
+    with requests.Session() as session:
+        assert [session.get(server.base_url + "184805").status_code for _ in range(3)] == [200, 200, 200]
+
+
+def test_scraper_against_stand_in(serve, base_url):
+    server = serve()
+    vlrs.set_base_url(server.base_url.rstrip('/'))
+    assert vlrs.BASE == server.base_url
+    match_ids = vlrs.get_player_match_ids(864, 60)
+    assert len(match_ids) == 60
+    assert len(set(match_ids)) == 60
+    match_data = vlrs.get_match_data(match_id=match_ids[0])
+    assert match_data
+    assert len(match_data) % 10 == 0
+    assert {player.match_id for player in match_data} == {int(match_ids[0])}
+    assert all(player.team_id != player.opponent_id for player in match_data)